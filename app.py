@@ -1,7 +1,22 @@
+import csv
+import gzip
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+
 import streamlit as st
+import streamlit.components.v1 as components
 import pandas as pd
 import mysql.connector
+from mysql.connector import errorcode
 import plotly.express as px
+from plotly.offline import get_plotlyjs_version
 
 # -------------------------
 # Database connection setup
@@ -33,6 +48,515 @@ def run_query(query):
     conn.close()
     return df
 
+# -------------------------
+# Figure cache (shared across sessions)
+# -------------------------
+
+# upper bound on serialized figure JSON held in memory per process
+FIGURE_CACHE_MAX_BYTES = 32 * 1024 * 1024
+FIGURE_HEIGHT = 450
+
+# cached figures are drawn with plotly.js directly, so the stored JSON is
+# sent as-is instead of being re-encoded by st.plotly_chart on every rerun
+FIGURE_HTML = """
+<div id="figure" style="height: {height}px;"></div>
+<script src="https://cdn.plot.ly/plotly-{version}.min.js"></script>
+<script>
+const fig = {payload};
+Plotly.newPlot("figure", fig.data, fig.layout, {{responsive: true}});
+</script>
+"""
+
+class FigureCache:
+    """LRU store of serialized figure JSON, evicted by total size in bytes."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            payload = self._entries.get(key)
+            if payload is not None:
+                self._entries.move_to_end(key)
+            return payload
+
+    def put(self, key, payload):
+        nbytes = len(payload)
+        if nbytes > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old)
+            self._entries[key] = payload
+            self.size += nbytes
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+@st.cache_resource
+def get_figure_cache():
+    # one instance per process, shared by every session
+    return FigureCache(FIGURE_CACHE_MAX_BYTES)
+
+def figure_key(frames, spec):
+    h = hashlib.sha256()
+    for frame in frames:
+        h.update(repr(list(frame.columns)).encode("utf-8"))
+        h.update(repr([str(t) for t in frame.dtypes]).encode("utf-8"))
+        h.update(pd.util.hash_pandas_object(frame, index=True).values.tobytes())
+    h.update(json.dumps(spec, sort_keys=True, default=str).encode("utf-8"))
+    return h.hexdigest()
+
+def plot_cached(frames, spec, build):
+    """Render a Plotly figure, building and serializing it only on a cache miss."""
+    cache = get_figure_cache()
+    key = figure_key(frames, spec)
+    payload = cache.get(key)
+    if payload is None:
+        # escape "</" so the JSON can't close the <script> tag it is embedded in
+        payload = build(*frames).to_json().replace("</", "<\\/")
+        cache.put(key, payload)
+    components.html(
+        FIGURE_HTML.format(height=FIGURE_HEIGHT, version=get_plotlyjs_version(), payload=payload),
+        height=FIGURE_HEIGHT + 20,
+    )
+
+def bar_chart(df, **kwargs):
+    plot_cached((df,), {"kind": "bar", **kwargs}, lambda d: px.bar(d, **kwargs))
+
+# -------------------------
+# Bulk order-line export
+# -------------------------
+
+EXPORT_DIR = "exports"
+EXPORT_CHUNK_ROWS = 5000
+# exports older than this are deleted when a new export starts
+EXPORT_RETENTION_SECONDS = 24 * 60 * 60
+# larger exports stay on disk instead of being offered as a download,
+# since Streamlit holds download data in memory per session
+EXPORT_DOWNLOAD_MAX_BYTES = 10 * 1024 * 1024
+
+ORDER_LINES_FROM = """
+FROM Orders o
+JOIN OrderItems oi ON o.order_id = oi.order_id
+JOIN ProductVariants pv ON oi.variant_id = pv.variant_id
+JOIN Products p ON pv.product_id = p.product_id
+WHERE o.order_date >= %s AND o.order_date < %s
+"""
+
+ORDER_LINES_QUERY = """
+SELECT
+    o.order_id,
+    o.user_id,
+    o.order_date,
+    o.status,
+    oi.variant_id,
+    p.product_id,
+    p.product_name,
+    pv.SKU,
+    pv.color,
+    pv.size,
+    oi.quantity,
+    oi.unit_price,
+    oi.line_total
+""" + ORDER_LINES_FROM + """
+ORDER BY o.order_id
+"""
+
+ORDER_LINES_COUNT_QUERY = "SELECT COUNT(*)" + ORDER_LINES_FROM
+
+class CsvExportWriter:
+    """Appends row chunks to a gzip-compressed CSV file."""
+
+    extension = "csv.gz"
+    mime = "application/gzip"
+
+    def __init__(self, path, columns):
+        self._file = gzip.open(path, "wt", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(columns)
+
+    def write(self, rows):
+        self._writer.writerows(rows)
+
+    def close(self):
+        self._file.close()
+
+class ParquetExportWriter:
+    """Appends row chunks as row groups of a Parquet file."""
+
+    extension = "parquet"
+    mime = "application/octet-stream"
+
+    def __init__(self, path, columns):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self._pa = pa
+        self._pq = pq
+        self._path = path
+        self._columns = list(columns)
+        self._writer = None
+
+    def _schema(self, table):
+        # pin types from the first chunk so later chunks can't drift
+        pa = self._pa
+        fields = []
+        for field in table.schema:
+            if pa.types.is_null(field.type):
+                field = field.with_type(pa.string())
+            elif pa.types.is_decimal(field.type):
+                field = field.with_type(pa.decimal128(38, field.type.scale))
+            fields.append(field)
+        return pa.schema(fields)
+
+    def write(self, rows):
+        pa = self._pa
+        table = pa.Table.from_arrays(
+            [pa.array(col) for col in zip(*rows)],
+            names=self._columns,
+        )
+        if self._writer is None:
+            self._writer = self._pq.ParquetWriter(self._path, self._schema(table))
+        self._writer.write_table(table.cast(self._writer.schema))
+
+    def close(self):
+        if self._writer is None:
+            # no rows: still produce a readable file with the column names
+            pa = self._pa
+            schema = pa.schema([(name, pa.string()) for name in self._columns])
+            self._pq.write_table(schema.empty_table(), self._path)
+        else:
+            self._writer.close()
+
+EXPORT_WRITERS = {
+    "CSV (gzip)": CsvExportWriter,
+    "Parquet": ParquetExportWriter,
+}
+
+def remove_old_exports(max_age=EXPORT_RETENTION_SECONDS):
+    cutoff = time.time() - max_age
+    for name in os.listdir(EXPORT_DIR):
+        path = os.path.join(EXPORT_DIR, name)
+        try:
+            if os.path.isfile(path) and os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except OSError:
+            # another session may have removed it first
+            pass
+
+def kill_query(connection_id):
+    # stop a running statement from a second connection, so closing the
+    # original connection doesn't have to drain the rest of its result set
+    conn = get_connection()
+    try:
+        cur = conn.cursor()
+        cur.execute(f"KILL QUERY {int(connection_id)}")
+    finally:
+        conn.close()
+
+def export_order_lines(start_date, end_date, writer_cls, path,
+                       progress=None, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Stream order lines for [start_date, end_date] into a file on disk.
+
+    Rows are pulled from an unbuffered (server-side) cursor chunk by chunk,
+    so memory use does not grow with the size of the export. There is no
+    separate cancel flag: a widget click makes Streamlit interrupt the run
+    at the next UI call (the `progress` callback). When that happens or the
+    export fails, the server-side query is killed and the partial file is
+    removed.
+    """
+    params = (start_date, end_date + timedelta(days=1))
+    conn = get_connection()
+    writer = None
+    streaming = False
+    try:
+        cur = conn.cursor()
+        cur.execute(ORDER_LINES_COUNT_QUERY, params)
+        total = cur.fetchone()[0]
+        cur.close()
+
+        cur = conn.cursor(buffered=False)
+        cur.execute(ORDER_LINES_QUERY, params)
+        streaming = True
+        writer = writer_cls(path, cur.column_names)
+
+        written = 0
+        while True:
+            rows = cur.fetchmany(chunk_rows)
+            if not rows:
+                streaming = False
+                break
+            writer.write(rows)
+            written += len(rows)
+            if progress is not None:
+                progress(written, total)
+
+        writer.close()
+        writer = None
+        return written
+    except BaseException:
+        # also covers Streamlit interrupting the run when the user cancels
+        if streaming:
+            try:
+                kill_query(conn.connection_id)
+            except Exception:
+                pass
+        try:
+            if writer is not None:
+                writer.close()
+        except Exception:
+            pass
+        finally:
+            if os.path.exists(path):
+                os.remove(path)
+        raise
+    finally:
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+# -------------------------
+# Transactional order writer
+# -------------------------
+
+DEMO_EMAIL = "button_demo@groovycoder.test"
+ORDER_TAX_RATE = 0.08
+ORDER_MAX_ATTEMPTS = 5
+# errors that mean "roll back and try the whole order again"
+RETRYABLE_ERRNOS = (errorcode.ER_LOCK_DEADLOCK, errorcode.ER_LOCK_WAIT_TIMEOUT)
+
+class OutOfStock(Exception):
+    pass
+
+def get_or_create_demo_user(cur):
+    cur.execute("SELECT user_id FROM Users WHERE email = %s", (DEMO_EMAIL,))
+    row = cur.fetchone()
+    if row:
+        return row[0]
+
+    cur.execute(
+        """
+        INSERT INTO Users (first_name, last_name, email, phone, password_hash, role)
+        VALUES (%s, %s, %s, %s, %s, %s)
+        """,
+        ("Button", "Demo", DEMO_EMAIL, "555-0300", "dummyhash", "customer"),
+    )
+    return cur.lastrowid
+
+def get_or_create_address(cur, user_id, type_):
+    cur.execute(
+        "SELECT address_id FROM Addresses WHERE user_id = %s AND address_type = %s LIMIT 1",
+        (user_id, type_),
+    )
+    row = cur.fetchone()
+    if row:
+        return row[0]
+
+    cur.execute(
+        """
+        INSERT INTO Addresses
+        (user_id, street, city, state, zip, country, address_type)
+        VALUES (%s, %s, %s, %s, %s, %s, %s)
+        """,
+        (user_id, "1 Demo Plaza", "San Diego", "CA", "92101", "USA", type_),
+    )
+    return cur.lastrowid
+
+def write_order(conn, user_id, ship_id, bill_id, lines, status, order_date):
+    """Write a multi-line order in one transaction, reserving stock atomically.
+
+    `lines` is a list of (variant_id, quantity). Each line decrements stock
+    with a conditional UPDATE, so concurrent writers can never oversell;
+    if any line can't be filled the whole order is rolled back and
+    OutOfStock is raised. Returns (order_id, total).
+    """
+    if not lines:
+        raise ValueError("An order needs at least one line")
+    for variant_id, quantity in lines:
+        if quantity <= 0:
+            raise ValueError(f"Quantity for variant {variant_id} must be positive, got {quantity}")
+
+    # merge duplicate variants and lock rows in a fixed order to avoid deadlocks
+    merged = {}
+    for variant_id, quantity in lines:
+        merged[variant_id] = merged.get(variant_id, 0) + quantity
+
+    cur = conn.cursor()
+    try:
+        ordered = sorted(merged.items())
+        for variant_id, quantity in ordered:
+            cur.execute(
+                """
+                UPDATE ProductVariants
+                SET stock_quantity = stock_quantity - %s
+                WHERE variant_id = %s AND active = 1 AND stock_quantity >= %s
+                """,
+                (quantity, variant_id, quantity),
+            )
+            if cur.rowcount != 1:
+                raise OutOfStock(f"Variant {variant_id} does not have {quantity} in stock")
+
+        # one round trip for all prices, rather than one per locked row
+        placeholders = ", ".join(["%s"] * len(ordered))
+        cur.execute(
+            f"SELECT variant_id, retail_price FROM ProductVariants WHERE variant_id IN ({placeholders})",
+            tuple(variant_id for variant_id, _ in ordered),
+        )
+        prices = dict(cur.fetchall())
+        items = [
+            (variant_id, quantity, prices[variant_id], round(float(prices[variant_id]) * quantity, 2))
+            for variant_id, quantity in ordered
+        ]
+
+        subtotal = round(sum(item[3] for item in items), 2)
+        tax = round(subtotal * ORDER_TAX_RATE, 2)
+        total = subtotal + tax
+
+        cur.execute(
+            """
+            INSERT INTO Orders
+            (user_id, shipping_address_id, billing_address_id,
+             order_date, status, subtotal, tax_amount, total_amount)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+            """,
+            (user_id, ship_id, bill_id, order_date, status, subtotal, tax, total),
+        )
+        order_id = cur.lastrowid
+
+        cur.executemany(
+            """
+            INSERT INTO OrderItems
+            (order_id, variant_id, quantity, unit_price, line_total)
+            VALUES (%s, %s, %s, %s, %s)
+            """,
+            [(order_id,) + item for item in items],
+        )
+
+        conn.commit()
+        return order_id, total
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+def write_order_with_retry(conn, *args, max_attempts=ORDER_MAX_ATTEMPTS, on_retry=None):
+    """Call write_order, retrying on deadlock / lock wait timeout with backoff."""
+    for attempt in range(1, max_attempts + 1):
+        try:
+            return write_order(conn, *args)
+        except mysql.connector.Error as ex:
+            if ex.errno not in RETRYABLE_ERRNOS or attempt == max_attempts:
+                raise
+            if on_retry is not None:
+                on_retry(ex)
+            time.sleep(random.uniform(0, 0.01 * 2 ** attempt))
+
+def random_order_date():
+    # random timestamp within the last 6 months
+    ts = datetime.utcnow() - timedelta(days=random.randint(0, 180))
+    return ts.strftime("%Y-%m-%d %H:%M:%S")
+
+class LoadStats:
+    """Counters shared by the writer threads of a load run."""
+
+    def __init__(self):
+        self.committed = 0
+        self.out_of_stock = 0
+        self.retries = 0
+        self.failed = 0
+        self.errors = []
+        self._lock = threading.Lock()
+
+    def add_committed(self):
+        with self._lock:
+            self.committed += 1
+
+    def add_out_of_stock(self):
+        with self._lock:
+            self.out_of_stock += 1
+
+    def add_retry(self):
+        with self._lock:
+            self.retries += 1
+
+    def add_error(self, ex):
+        with self._lock:
+            self.failed += 1
+            if len(self.errors) < 5:
+                self.errors.append(str(ex))
+
+def run_order_load(writers, orders_per_writer, max_lines=3, max_quantity=3):
+    """Run concurrent writer threads against the write path.
+
+    Every order goes to the demo user, so "Undo Demo Sales Orders" removes
+    the generated data and restores stock. Each thread opens its connection
+    before the clock starts, so `elapsed` covers only the order writes.
+    Returns (stats, elapsed seconds).
+    """
+    conn = get_write_connection()
+    try:
+        cur = conn.cursor()
+        user_id = get_or_create_demo_user(cur)
+        ship_id = get_or_create_address(cur, user_id, "shipping")
+        bill_id = get_or_create_address(cur, user_id, "billing")
+        cur.execute("SELECT variant_id FROM ProductVariants WHERE active = 1")
+        variant_ids = [row[0] for row in cur.fetchall()]
+        conn.commit()
+    finally:
+        conn.close()
+
+    stats = LoadStats()
+    if not variant_ids:
+        return stats, 0.0
+
+    # writers plus this thread, which starts the clock once all are connected
+    ready = threading.Barrier(writers + 1)
+
+    def worker():
+        conn = None
+        try:
+            conn = get_write_connection()
+        except Exception as ex:
+            stats.add_error(ex)
+        ready.wait()
+        if conn is None:
+            return
+        try:
+            for _ in range(orders_per_writer):
+                lines = [
+                    (random.choice(variant_ids), random.randint(1, max_quantity))
+                    for _ in range(random.randint(1, max_lines))
+                ]
+                try:
+                    write_order_with_retry(
+                        conn, user_id, ship_id, bill_id, lines,
+                        random.choice(["paid", "shipped"]), random_order_date(),
+                        on_retry=lambda ex: stats.add_retry(),
+                    )
+                    stats.add_committed()
+                except OutOfStock:
+                    stats.add_out_of_stock()
+                except Exception as ex:
+                    stats.add_error(ex)
+        finally:
+            conn.close()
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(writers)]
+    for t in threads:
+        t.start()
+    ready.wait()
+    started = time.perf_counter()
+    for t in threads:
+        t.join()
+    return stats, time.perf_counter() - started
+
 # -------------------------
 # Streamlit UI
 # -------------------------
@@ -40,7 +564,7 @@ def run_query(query):
 st.title("GroovyCoder Clothing Analytics Dashboard")
 
 # Create tabs
-tab_overview, tab_products, tab_sales, tab_customers, tab_prefs, tab_forecast, tab_demo= st.tabs(
+tab_overview, tab_products, tab_sales, tab_customers, tab_prefs, tab_forecast, tab_export, tab_demo= st.tabs(
     [
         "Overview",
         "Products & Categories",
@@ -48,6 +572,7 @@ tab_overview, tab_products, tab_sales, tab_customers, tab_prefs, tab_forecast, t
         "Customers",
         "Preferences",
         "Demand Forecast",
+        "Data Export",
         "Demo"
     ]
 )
@@ -110,14 +635,13 @@ with tab_products:
     st.subheader("Top 10 Best-Selling Variants")
     st.dataframe(df_q1)
 
-    fig_q1 = px.bar(
+    bar_chart(
         df_q1,
         x="SKU",
         y="total_quantity_sold",
         color="product_name",
         title="Top-Selling Products (By Quantity)",
     )
-    st.plotly_chart(fig_q1, use_container_width=True)
 
     # ---------------------------------------------------------
     # Q2: Revenue by Category
@@ -138,13 +662,12 @@ with tab_products:
     st.subheader("Revenue by Category")
     st.dataframe(df_q2)
 
-    fig_q2 = px.bar(
+    bar_chart(
         df_q2,
         x="category_name",
         y="revenue",
         title="Total Revenue by Category",
     )
-    st.plotly_chart(fig_q2, use_container_width=True)
 
 # =========================================================
 # TAB 3: SALES PERFORMANCE
@@ -170,13 +693,12 @@ with tab_sales:
     st.subheader("Revenue by Month")
     st.dataframe(df_q3)
 
-    fig_q3 = px.bar(
+    bar_chart(
         df_q3,
         x="month",
         y="revenue",
         title="Monthly Revenue Trend",
     )
-    st.plotly_chart(fig_q3, use_container_width=True)
 
     # ---------------------------------------------------------
     # Q4: Average Order Value (AOV)
@@ -229,13 +751,12 @@ with tab_customers:
     st.subheader("Top 10 Customers by Total Spend")
     st.dataframe(df_q5)
 
-    fig_q5 = px.bar(
+    bar_chart(
         df_q5,
         x="customer_name",
         y="total_spent",
         title="Top Customers by Total Revenue",
     )
-    st.plotly_chart(fig_q5, use_container_width=True)
 
 # =========================================================
 # TAB 5: PREFERENCES (Sizes, Colors, Day of Week)
@@ -261,13 +782,12 @@ with tab_prefs:
     st.subheader("Units Sold by Size")
     st.dataframe(df_q6)
 
-    fig_q6 = px.bar(
+    bar_chart(
         df_q6,
         x="size",
         y="total_quantity",
         title="Most Popular Sizes",
     )
-    st.plotly_chart(fig_q6, use_container_width=True)
 
     # ---------------------------------------------------------
     # Q7: Popular Colors
@@ -289,13 +809,12 @@ with tab_prefs:
     st.subheader("Units Sold by Color")
     st.dataframe(df_q7)
 
-    fig_q7 = px.bar(
+    bar_chart(
         df_q7,
         x="color",
         y="total_quantity",
         title="Most Popular Colors",
     )
-    st.plotly_chart(fig_q7, use_container_width=True)
 
     # ---------------------------------------------------------
     # Q8: Sales by Day of Week
@@ -318,13 +837,12 @@ with tab_prefs:
     st.subheader("Orders and Revenue by Day of Week")
     st.dataframe(df_q8)
 
-    fig_q8 = px.bar(
+    bar_chart(
         df_q8,
         x="day_name",
         y="revenue",
         title="Revenue by Day of Week",
     )
-    st.plotly_chart(fig_q8, use_container_width=True)
 
 # =========================================================
 # TAB 6: DEMAND FORECASTING
@@ -416,56 +934,63 @@ with tab_forecast:
         hist_plot = df[["month_label", "units_sold"]].rename(
             columns={"month_label": "month", "units_sold": "value"}
         )
-        fore_plot = df_forecast[["month_label", "forecast_units_sold"]].rename(
-            columns={"month_label": "month", "forecast_units_sold": "value"}
-        )
 
-        fig = go.Figure()
+        def build_forecast_figure(hist_plot, df_forecast):
+            fore_plot = df_forecast[["month_label", "forecast_units_sold"]].rename(
+                columns={"month_label": "month", "forecast_units_sold": "value"}
+            )
+
+            fig = go.Figure()
 
-        # historical line
-        fig.add_trace(
-            go.Scatter(
-                x=hist_plot["month"],
-                y=hist_plot["value"],
-                mode="lines+markers",
-                name="Historical"
+            # historical line
+            fig.add_trace(
+                go.Scatter(
+                    x=hist_plot["month"],
+                    y=hist_plot["value"],
+                    mode="lines+markers",
+                    name="Historical"
+                )
             )
-        )
 
-        # forecast line
-        fig.add_trace(
-            go.Scatter(
-                x=fore_plot["month"],
-                y=fore_plot["value"],
-                mode="lines+markers",
-                name="Forecast"
+            # forecast line
+            fig.add_trace(
+                go.Scatter(
+                    x=fore_plot["month"],
+                    y=fore_plot["value"],
+                    mode="lines+markers",
+                    name="Forecast"
+                )
             )
-        )
 
-        # confidence band (upper then lower with fill)
-        fig.add_trace(
-            go.Scatter(
-                x=df_forecast["month_label"],
-                y=df_forecast["upper"],
-                mode="lines",
-                name="Forecast upper (+10%)",
-                showlegend=False
+            # confidence band (upper then lower with fill)
+            fig.add_trace(
+                go.Scatter(
+                    x=df_forecast["month_label"],
+                    y=df_forecast["upper"],
+                    mode="lines",
+                    name="Forecast upper (+10%)",
+                    showlegend=False
+                )
             )
-        )
-        fig.add_trace(
-            go.Scatter(
-                x=df_forecast["month_label"],
-                y=df_forecast["lower"],
-                mode="lines",
-                fill="tonexty",
-                name="Forecast lower (-10%)",
-                showlegend=False
+            fig.add_trace(
+                go.Scatter(
+                    x=df_forecast["month_label"],
+                    y=df_forecast["lower"],
+                    mode="lines",
+                    fill="tonexty",
+                    name="Forecast lower (-10%)",
+                    showlegend=False
+                )
             )
-        )
 
-        fig.update_layout(title="Monthly Sales Forecast", xaxis_title="Month", yaxis_title="Units Sold")
+            fig.update_layout(title="Monthly Sales Forecast", xaxis_title="Month", yaxis_title="Units Sold")
+            return fig
 
-        st.plotly_chart(fig, use_container_width=True)
+        plot_cached(
+            (hist_plot, df_forecast),
+            {"kind": "forecast"},
+            build_forecast_figure,
+        )
 
         # ----------------------------------------
         # 7. Download CSV button
@@ -491,7 +1016,87 @@ with tab_forecast:
         )
 
 # =========================================================
-# TAB 7: Demo
+# TAB 7: DATA EXPORT
+# =========================================================
+with tab_export:
+    st.header("Raw Order-Line Export")
+
+    col_start, col_end = st.columns(2)
+    export_start = col_start.date_input(
+        "From", value=date.today() - timedelta(days=30), key="export_start"
+    )
+    export_end = col_end.date_input("To", value=date.today(), key="export_end")
+    export_format = st.radio(
+        "Format", list(EXPORT_WRITERS), horizontal=True, key="export_format"
+    )
+
+    col_run, col_cancel = st.columns(2)
+    start_export = col_run.button("Start Export")
+    # clicking this interrupts a running export via Streamlit's rerun
+    cancel_export = col_cancel.button("Cancel Export")
+    st.caption(
+        "Interacting with any other control on the page while an export is "
+        "running also cancels it and discards the partial file."
+    )
+
+    # still set here only if the previous run was interrupted mid-export
+    if st.session_state.get("export_running"):
+        st.session_state["export_running"] = False
+        if cancel_export:
+            st.info("Export cancelled.")
+        else:
+            st.warning("The previous export was interrupted and its partial file was discarded.")
+
+    if start_export:
+        if export_start > export_end:
+            st.error("The start date must not be after the end date.")
+        else:
+            writer_cls = EXPORT_WRITERS[export_format]
+            os.makedirs(EXPORT_DIR, exist_ok=True)
+            remove_old_exports()
+            export_name = (
+                f"order_lines_{export_start:%Y%m%d}_{export_end:%Y%m%d}_"
+                f"{datetime.utcnow():%Y%m%d%H%M%S}_{uuid.uuid4().hex[:8]}.{writer_cls.extension}"
+            )
+            export_path = os.path.join(EXPORT_DIR, export_name)
+
+            progress_bar = st.progress(0.0, text="Starting export...")
+
+            def report_progress(written, total):
+                fraction = min(written / total, 1.0) if total else 1.0
+                progress_bar.progress(fraction, text=f"{written:,} / {total:,} rows")
+
+            st.session_state["export_running"] = True
+            try:
+                row_count = export_order_lines(
+                    export_start, export_end, writer_cls, export_path,
+                    progress=report_progress,
+                )
+                st.session_state["export_running"] = False
+                progress_bar.progress(1.0, text=f"{row_count:,} rows")
+                size = os.path.getsize(export_path)
+                st.success(f"Exported {row_count:,} rows to `{export_path}` ({size / 1024 / 1024:.1f} MB)")
+
+                if size <= EXPORT_DOWNLOAD_MAX_BYTES:
+                    with open(export_path, "rb") as f:
+                        st.download_button(
+                            label="Download Export",
+                            data=f,
+                            file_name=export_name,
+                            mime=writer_cls.mime,
+                        )
+                else:
+                    st.caption("The export is too large to download here; fetch it from the server path above.")
+            except ImportError:
+                st.session_state["export_running"] = False
+                st.error("Parquet export requires the `pyarrow` package.")
+            except Exception as ex:
+                st.session_state["export_running"] = False
+                st.error("Export failed.")
+                st.code(str(ex))
+
+# =========================================================
+# TAB 8: Demo
 # =========================================================
 with tab_demo:
     st.subheader("Demo Sales Tools")
@@ -502,62 +1107,22 @@ with tab_demo:
     
     if st.button("Generate Demo Sales Order"):
         try:
-            import random
-            from datetime import datetime, timedelta
-
             conn = get_write_connection()
             cur = conn.cursor()
 
             # -------------------------------
-            # 1) Create or retrieve demo user
-            # -------------------------------
-            demo_email = "button_demo@groovycoder.test"
-            cur.execute("SELECT user_id FROM Users WHERE email = %s", (demo_email,))
-            row = cur.fetchone()
-
-            if row:
-                user_id = row[0]
-            else:
-                cur.execute(
-                    """
-                    INSERT INTO Users (first_name, last_name, email, phone, password_hash, role)
-                    VALUES (%s, %s, %s, %s, %s, %s)
-                    """,
-                    ("Button", "Demo", demo_email, "555-0300", "dummyhash", "customer"),
-                )
-                user_id = cur.lastrowid
-
-            # -------------------------------
-            # 2) Create or retrieve addresses
+            # 1) Create or retrieve demo user and addresses
             # -------------------------------
-            def get_or_create_address(user_id, type_):
-                cur.execute(
-                    "SELECT address_id FROM Addresses WHERE user_id = %s AND address_type = %s LIMIT 1",
-                    (user_id, type_),
-                )
-                row = cur.fetchone()
-                if row:
-                    return row[0]
-
-                cur.execute(
-                    """
-                    INSERT INTO Addresses
-                    (user_id, street, city, state, zip, country, address_type)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s)
-                    """,
-                    (user_id, "1 Demo Plaza", "San Diego", "CA", "92101", "USA", type_),
-                )
-                return cur.lastrowid
-
-            ship_id = get_or_create_address(user_id, "shipping")
-            bill_id = get_or_create_address(user_id, "billing")
+            user_id = get_or_create_demo_user(cur)
+            ship_id = get_or_create_address(cur, user_id, "shipping")
+            bill_id = get_or_create_address(cur, user_id, "billing")
 
             # -------------------------------
-            # 3) Select random in-stock variant
+            # 2) Select random in-stock variant
             # -------------------------------
             cur.execute(
                 """
-                SELECT pv.variant_id, pv.retail_price, pv.stock_quantity, pv.color, pv.size
+                SELECT pv.variant_id, pv.stock_quantity, pv.color, pv.size
                 FROM ProductVariants pv
                 WHERE pv.active = 1 AND pv.stock_quantity > 0
                 ORDER BY RAND()
@@ -565,73 +1130,29 @@ with tab_demo:
                 """
             )
             row = cur.fetchone()
+            conn.commit()
 
             if not row:
                 st.error("No variants with stock remaining. Cannot generate demo sale.")
                 conn.close()
                 st.stop()
 
-            variant_id, price, stock, color, size = row
+            variant_id, stock, color, size = row
 
             # -------------------------------
-            # 4) Random quantity (1–3)
+            # 3) Write the order; stock is reserved atomically
             # -------------------------------
             quantity = random.randint(1, min(3, stock))
-            line_total = round(float(price) * quantity, 2)
-            tax = round(line_total * 0.08, 2)
-
-            total = line_total + tax
-
-            # -------------------------------
-            # 5) Random timestamp (within last 6 months)
-            # -------------------------------
-            ts = datetime.utcnow() - timedelta(days=random.randint(0, 180))
-            ts_str = ts.strftime("%Y-%m-%d %H:%M:%S")
-
-            # -------------------------------
-            # 6) Random order status
-            # -------------------------------
-            status = random.choice(["paid", "shipped"])
-
-            # -------------------------------
-            # 7) Insert order
-            # -------------------------------
-            cur.execute(
-                """
-                INSERT INTO Orders
-                (user_id, shipping_address_id, billing_address_id,
-                 order_date, status, subtotal, tax_amount, total_amount)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                """,
-                (user_id, ship_id, bill_id, ts_str, status, line_total, tax, total),
-            )
-            order_id = cur.lastrowid
-
-            # -------------------------------
-            # 8) Insert order item
-            # -------------------------------
-            cur.execute(
-                """
-                INSERT INTO OrderItems
-                (order_id, variant_id, quantity, unit_price, line_total)
-                VALUES (%s, %s, %s, %s, %s)
-                """,
-                (order_id, variant_id, quantity, price, line_total),
-            )
-
-            # -------------------------------
-            # 9) Reduce stock
-            # -------------------------------
-            cur.execute(
-                """
-                UPDATE ProductVariants
-                SET stock_quantity = stock_quantity - %s
-                WHERE variant_id = %s
-                """,
-                (quantity, variant_id),
-            )
+            try:
+                order_id, total = write_order_with_retry(
+                    conn, user_id, ship_id, bill_id, [(variant_id, quantity)],
+                    random.choice(["paid", "shipped"]), random_order_date(),
+                )
+            except OutOfStock:
+                st.error("The selected variant sold out before the order was placed. Try again.")
+                conn.close()
+                st.stop()
 
-            conn.commit()
             conn.close()
 
             st.success(
@@ -651,10 +1172,8 @@ with tab_demo:
             conn = get_write_connection()
             cur = conn.cursor()
 
-            demo_email = "button_demo@groovycoder.test"
-
             # 1. Find demo user
-            cur.execute("SELECT user_id FROM Users WHERE email=%s", (demo_email,))
+            cur.execute("SELECT user_id FROM Users WHERE email=%s", (DEMO_EMAIL,))
             row = cur.fetchone()
 
             if row:
@@ -707,4 +1226,44 @@ with tab_demo:
 
         except Exception as ex:
             st.error("Failed to undo demo sales data.")
-            st.code(str(ex))
\ No newline at end of file
+            st.code(str(ex))
+
+    # =========================================================
+    # WRITE-PATH LOAD SIMULATION
+    # =========================================================
+    st.subheader("Write-Path Load Simulation")
+
+    col_writers, col_orders, col_lines = st.columns(3)
+    load_writers = col_writers.number_input("Writer threads", min_value=1, max_value=32, value=4)
+    load_orders = col_orders.number_input("Orders per writer", min_value=1, max_value=1000, value=25)
+    load_lines = col_lines.number_input("Max lines per order", min_value=1, max_value=10, value=3)
+
+    if st.button("Run Load Simulation"):
+        try:
+            with st.spinner("Writing orders..."):
+                stats, elapsed = run_order_load(int(load_writers), int(load_orders), int(load_lines))
+
+            orders = stats.committed + stats.out_of_stock + stats.failed
+            attempts = orders + stats.retries
+            throughput = stats.committed / elapsed if elapsed else 0.0
+            # stock contention: orders rejected by the conditional decrement
+            out_of_stock_rate = stats.out_of_stock / orders if orders else 0.0
+            # lock contention: transaction attempts rolled back on deadlock / lock wait timeout
+            retry_rate = stats.retries / attempts if attempts else 0.0
+
+            col1, col2, col3, col4 = st.columns(4)
+            col1.metric("Throughput", f"{throughput:.1f} orders/s")
+            col2.metric("Committed", stats.committed)
+            col3.metric("Out-of-stock rate", f"{out_of_stock_rate:.1%}")
+            col4.metric("Lock retry rate", f"{retry_rate:.1%}")
+            st.caption(
+                f"{stats.out_of_stock} orders rejected for insufficient stock, "
+                f"{stats.retries} deadlock / lock-wait retries, {stats.failed} failed orders "
+                f"in {elapsed:.2f}s. Use \"Undo Demo Sales Orders\" to remove the generated data."
+            )
+            for err in stats.errors:
+                st.code(err)
+
+        except Exception as ex:
+            st.error("Load simulation failed.")
+            st.code(str(ex))